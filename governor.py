@@ -2,41 +2,59 @@ import re
 import os
 import sys
 import json
-import copy
 import time
 import random
 import signal
+import hashlib
 import argparse
+import functools
+import threading
 import subprocess
-from glob import glob
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-# Windows specific imports
-import win32gui
-import win32api
-import win32process
-import win32con
+# Windows specific imports. The Win32 calls go through ctypes directly so
+# importing this module for get_config/metrics does not require pywin32;
+# pyautogui is deferred to first use for the same reason (it drags in PIL)
 import ctypes
+import ctypes.wintypes
 
 # Other
 import numpy as np
-import pyautogui
-import matplotlib.pyplot as plt
-from skimage import img_as_float, io
-from skimage.metrics import (
-    peak_signal_noise_ratio,
-    structural_similarity,
-    mean_squared_error,
+from skimage import img_as_float32, io
+
+from metrics import (
+    gpu_metrics,
+    fast_ssim,
+    ssim_parallel,
+    ssim_luma,
+    mse_uint8,
+    mse_float,
+    psnr_from_mse,
 )
 
+# Optional accelerators
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError):
+    # PyTurboJPEG not installed or the native libjpeg-turbo DLL is missing
+    _turbojpeg = None
+
 __doc__ = """
 This script is used to run FSR tests. It starts the renderer and upscaler processes
 and collects metrics from them and the GPU. The metrics are then printed to the
 console in JSON format.
 """
-pyautogui.FAILSAFE = False
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 FSR_DIR = os.path.join(SCRIPT_DIR, "bin")
+BENCHMARK_DIR = os.path.join(FSR_DIR, "benchmark")
 TSR_SHARED_BUFFER_COUNT = 10
 
 UPSCALERS = [
@@ -53,10 +71,10 @@ UPSCALERS = [
 ]
 
 # List of upscalers that require jitter, otherwise it should be disabled
-NEEDS_JITTER = ["FSR2", "FSR3Upscale", "FSR3", "DLSSUpscale", "DLSS"]
+NEEDS_JITTER = frozenset(["FSR2", "FSR3Upscale", "FSR3", "DLSSUpscale", "DLSS"])
 
 # List of upscalers that has Frame Generation
-FRAME_GENERATION = ["FSR3", "DLSS"]
+FRAME_GENERATION = frozenset(["FSR3", "DLSS"])
 
 DLSS_MODES = [
     "Performance",
@@ -65,82 +83,133 @@ DLSS_MODES = [
     "UltraPerformance",
 ]
 
+# O(1) lookup tables for the list scans in get_config
+UPSCALER_IDX = {name: i for i, name in enumerate(UPSCALERS)}
+DLSS_IDX = {name: i for i, name in enumerate(DLSS_MODES)}
+
+def _load_json(path):
+    with open(path, "rb") as json_file:
+        data = json_file.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
 # Get the default config
-with open(
-    os.path.join(SCRIPT_DIR, "samples/fsr/config/fsrconfig.json"), "r", encoding="utf-8"
-) as f:
-    config = json.load(f)
+config = _load_json(os.path.join(SCRIPT_DIR, "samples/fsr/config/fsrconfig.json"))
 
+framework_config = _load_json(
+    os.path.join(SCRIPT_DIR, "framework/cauldron/framework/config/cauldronconfig.json")
+)
 
-with open(
-    os.path.join(SCRIPT_DIR, "framework/cauldron/framework/config/cauldronconfig.json"),
-    "r",
-    encoding="utf-8",
-) as f:
-    framework_config = json.load(f)
+# Sentinel marking a key the patch removes from the base config
+_DELETED = object()
 
 
 def utcnow_iso8601():
     return datetime.now(timezone.utc).isoformat()
 
 
-# Prepare the config
-def get_config(mode, opts):
-    tmp = copy.deepcopy(config)
-    tmp_framework = copy.deepcopy(framework_config)
+def _merge_patch(base, patch):
+    """Return a copy-on-write merge of ``patch`` onto ``base``.
+
+    Only the dicts along patched paths are copied; untouched subtrees are
+    shared with the base config, so callers must treat the result as
+    read-only. Values of ``_DELETED`` remove the key.
+    """
+    out = dict(base)
+    for key, value in patch.items():
+        if value is _DELETED:
+            out.pop(key, None)
+        elif isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = _merge_patch(out[key], value)
+        else:
+            out[key] = value
+    return out
 
-    # Apply mode specific settings
-    tmp["FidelityFX FSR"]["TSR"]["Mode"] = mode
 
-    # Apply present resolution settings
-    tmp["FidelityFX FSR"]["Presentation"]["Width"] = opts.present_res[0]
-    tmp["FidelityFX FSR"]["Presentation"]["Height"] = opts.present_res[1]
+# Fully-built configs keyed by the option fields they depend on; repeat
+# builds (compare mode, sweeps) become a dict lookup
+_config_cache = {}
 
-    # Apply FPS settings
-    tmp["FidelityFX FSR"]["FPSLimiter"]["UseReflex"] = False  # Not operational
-    tmp["FidelityFX FSR"]["FPSLimiter"]["TargetFPS"] = opts.fps
-    tmp["FidelityFX FSR"]["FPSLimiter"][
-        "UseGPULimiter"
-    ] = False  # Messes with GPU metrics
 
-    # Set the scene exposure
-    tmp["FidelityFX FSR"]["Content"]["SceneExposure"] = opts.scene_exposure
+# Prepare the config
+def get_config(mode, opts):
+    key = (
+        mode,
+        opts.upscaler,
+        opts.dlssMode,
+        opts.scene,
+        opts.fps,
+        tuple(opts.present_res),
+        tuple(opts.render_res),
+        opts.scene_exposure,
+        opts.reduced_motion,
+        opts.disable_animation,
+        bool(opts.stream),
+    )
+    cached = _config_cache.get(key)
+    if cached is None:
+        cached = _config_cache[key] = _build_config(mode, opts)
+    return cached
+
+
+def _build_config(mode, opts):
+    # Build a patch of only the fields that differ from the base config; the
+    # merge then clones O(changed subtrees) instead of the whole tree
+    content = {"SceneExposure": opts.scene_exposure}
+    fsr = {
+        # Apply mode and upscaler specific settings
+        "TSR": {"Mode": mode, "Upscaler": UPSCALER_IDX[opts.upscaler]},
+        # Apply present resolution settings
+        "Presentation": {
+            "Width": opts.present_res[0],
+            "Height": opts.present_res[1],
+        },
+        # Apply FPS settings
+        "FPSLimiter": {
+            "UseReflex": False,  # Not operational
+            "TargetFPS": opts.fps,
+            "UseGPULimiter": False,  # Messes with GPU metrics
+        },
+        "Content": content,
+        # Apply render settings
+        "Render": {
+            "EnableJitter": opts.upscaler in NEEDS_JITTER,
+            "InitialRenderWidth": opts.render_res[0],
+            "InitialRenderHeight": opts.render_res[1],
+        },
+    }
 
     # Apply scene settings
     if opts.scene == "Sponza":
-        tmp["FidelityFX FSR"]["Content"]["Scenes"] = [
-            "../media/SponzaNew/MainSponza.gltf"
-        ]
-        tmp["FidelityFX FSR"]["Content"]["Camera"] = "PhysCamera003"
+        content["Scenes"] = ["../media/SponzaNew/MainSponza.gltf"]
+        content["Camera"] = "PhysCamera003"
     elif opts.scene == "Brutalism":
-        tmp["FidelityFX FSR"]["Content"]["Scenes"] = [
-            "../media/Brutalism/BrutalistHall.gltf"
-        ]
-        tmp["FidelityFX FSR"]["Content"]["Camera"] = "persp9_Orientation"
+        content["Scenes"] = ["../media/Brutalism/BrutalistHall.gltf"]
+        content["Camera"] = "persp9_Orientation"
     elif opts.scene == "Bistro":
-        tmp["FidelityFX FSR"]["Content"]["Scenes"] = [
-            "../media/BistroInterior/BistroInrterior.gltf"
-        ]
-        tmp["FidelityFX FSR"]["Content"][
-            "Camera"
-        ] = "Camera_6"  # 5 is visually better but 6 is more GPU intensive
+        content["Scenes"] = ["../media/BistroInterior/BistroInrterior.gltf"]
+        # 5 is visually better but 6 is more GPU intensive
+        content["Camera"] = "Camera_6"
     else:
         raise ValueError("Invalid scene")
 
     # Apply reduced motion settings
     if opts.reduced_motion:
-        tmp["FidelityFX FSR"]["Content"]["ParticleSpawners"] = []
-        tmp["FidelityFX FSR"]["TSR"]["RenderModules"]["Default"].remove(
-            "AnimatedTexturesRenderModule"
-        )
-        tmp["FidelityFX FSR"]["TSR"]["RenderModules"]["Renderer"].remove(
-            "AnimatedTexturesRenderModule"
-        )
+        content["ParticleSpawners"] = []
+        modules = config["FidelityFX FSR"]["TSR"]["RenderModules"]
+        fsr["TSR"]["RenderModules"] = {
+            "Default": [
+                m for m in modules["Default"] if m != "AnimatedTexturesRenderModule"
+            ],
+            "Renderer": [
+                m for m in modules["Renderer"] if m != "AnimatedTexturesRenderModule"
+            ],
+        }
 
     # Apply the animation configuration
     spd = 0.002 * 60 / opts.fps
     if opts.scene == "Sponza":
-        tmp["FidelityFX FSR"]["Content"]["Animation"] = {
+        content["Animation"] = {
             "Enabled": not opts.disable_animation,
             "p": 12.0,
             "q": 3.0,
@@ -153,7 +222,7 @@ def get_config(mode, opts):
             "lz": 0.0,
         }
     elif opts.scene == "Brutalism":
-        tmp["FidelityFX FSR"]["Content"]["Animation"] = {
+        content["Animation"] = {
             "Enabled": not opts.disable_animation,
             "p": 10.0,
             "q": 3.0,
@@ -166,7 +235,7 @@ def get_config(mode, opts):
             "lz": -30.0,
         }
     elif opts.scene == "Bistro":
-        tmp["FidelityFX FSR"]["Content"]["Animation"] = {
+        content["Animation"] = {
             "Enabled": not opts.disable_animation,
             "p": 3,
             "q": 1,
@@ -181,72 +250,144 @@ def get_config(mode, opts):
 
     # Remove content on upscaler if running in detached mode
     if mode == "Upscaler":
-        del tmp["FidelityFX FSR"]["Content"]["Scenes"]
-        del tmp["FidelityFX FSR"]["Content"]["Camera"]
-        del tmp["FidelityFX FSR"]["Content"]["Animation"]
-        del tmp["FidelityFX FSR"]["Content"]["DiffuseIBL"]
-        del tmp["FidelityFX FSR"]["Content"]["SpecularIBL"]
-
-    # Apply upscaler settings
-    tmp["FidelityFX FSR"]["TSR"]["Upscaler"] = UPSCALERS.index(opts.upscaler)
-
-    # Apply render settings
-    tmp["FidelityFX FSR"]["Render"] = {
-        "EnableJitter": opts.upscaler in NEEDS_JITTER,
-        "InitialRenderWidth": opts.render_res[0],
-        "InitialRenderHeight": opts.render_res[1],
-    }
+        content["Scenes"] = _DELETED
+        content["Camera"] = _DELETED
+        content["Animation"] = _DELETED
+        content["DiffuseIBL"] = _DELETED
+        content["SpecularIBL"] = _DELETED
 
     # Apply DLSS settings
     if "DLSS" in opts.upscaler:
-        tmp["FidelityFX FSR"]["TSR"]["RenderModuleOverrides"]["Default"][
-            "DLSSUpscaleRenderModule"
-        ]["mode"] = (DLSS_MODES.index(opts.dlssMode) + 1)
-        tmp["FidelityFX FSR"]["TSR"]["RenderModuleOverrides"]["Upscaler"][
-            "DLSSUpscaleRenderModule"
-        ]["mode"] = (DLSS_MODES.index(opts.dlssMode) + 1)
+        dlss_mode = DLSS_IDX[opts.dlssMode] + 1
+        fsr["TSR"]["RenderModuleOverrides"] = {
+            "Default": {"DLSSUpscaleRenderModule": {"mode": dlss_mode}},
+            "Upscaler": {"DLSSUpscaleRenderModule": {"mode": dlss_mode}},
+        }
 
     # Apply streaming settings
     if opts.stream and mode in ("Default", "Upscaler"):
-        tmp["FidelityFX FSR"]["Stream"] = {
+        fsr["Stream"] = {
             "Enabled": True,
             "Host": "https://localhost",
             "Port": 4443,
             "Name": "live",
         }
     else:
-        del tmp["FidelityFX FSR"]["Stream"]
+        fsr["Stream"] = _DELETED
 
     # Modify the allocations
+    framework_patch = {}
     if mode == "Upscaler":
-        tmp_framework["Cauldron"]["Allocations"] = {
-            "UploadHeapSize": 41943040,  # / 10
-            "DynamicBufferPoolSize": 7864320,
-            "GPUSamplerViewCount": 300,
-            "GPUResourceViewCount": 6000,  # / 10
-            "CPUResourceViewCount": 5000,  # / 10
-            "CPURenderViewCount": 100,
-            "CPUDepthViewCount": 100,
+        framework_patch["Cauldron"] = {
+            "Allocations": {
+                "UploadHeapSize": 41943040,  # / 10
+                "DynamicBufferPoolSize": 7864320,
+                "GPUSamplerViewCount": 300,
+                "GPUResourceViewCount": 6000,  # / 10
+                "CPUResourceViewCount": 5000,  # / 10
+                "CPURenderViewCount": 100,
+                "CPUDepthViewCount": 100,
+            }
         }
 
     return {
-        "sample": tmp,
-        "framework": tmp_framework,
+        "sample": _merge_patch(config, {"FidelityFX FSR": fsr}),
+        "framework": _merge_patch(framework_config, framework_patch),
     }
 
 
-def apply_config(config_data):
-    with open(
-        os.path.join(FSR_DIR, "configs/fsrconfig.json"), "w", encoding="utf-8"
-    ) as config_file:
-        json.dump(config_data["sample"], config_file, indent=4)
-    with open(
-        os.path.join(FSR_DIR, "configs/cauldronconfig.json"), "w", encoding="utf-8"
-    ) as config_file:
-        json.dump(config_data["framework"], config_file, indent=4)
+class _CrossProcessLock:
+    """Serializes a critical section across threads and governor processes.
+
+    The config files in bin/configs are shared machine-wide, so the
+    apply-config/spawn/ready window must be held apart not only between
+    --parallel-compare threads but also between whole governor processes
+    (validate.py --jobs); otherwise one run's exe can start up against
+    another run's freshly written config. A named kernel mutex extends the
+    in-process lock's guarantee across processes.
+    """
+
+    _INFINITE = 0xFFFFFFFF
+
+    def __init__(self, name):
+        self._name = name
+        self._local = threading.Lock()
+        self._handle = None
+
+    def __enter__(self):
+        self._local.acquire()
+        if self._handle is None:
+            self._handle = ctypes.windll.kernel32.CreateMutexW(
+                None, False, self._name
+            )
+        ctypes.windll.kernel32.WaitForSingleObject(self._handle, self._INFINITE)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        ctypes.windll.kernel32.ReleaseMutex(self._handle)
+        self._local.release()
+
+
+# Serializes the apply-config/spawn/ready window when two main() calls run
+# concurrently, since all child processes read the same config files at startup
+_spawn_lock = _CrossProcessLock("Local\\FFX_FSR_GovernorSpawn")
 
 
-def parse_args():
+# Digest and post-write stat signature of the bytes last written to each
+# config path; repeat writes of an identical config (sweeps, the compare
+# pass) are skipped entirely
+_written_config_hashes = {}
+
+
+def _stat_signature(path):
+    """Size and mtime of *path*, or None when it cannot be statted."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _dump_config(data, path, pretty=False):
+    # The configs are machine-consumed; compact output skips the pretty-print
+    # path of the encoder and halves the bytes written
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        payload = orjson.dumps(data, option=option)
+    elif pretty:
+        payload = json.dumps(data, indent=4).encode("utf-8")
+    else:
+        payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+    # A matching digest means this process last wrote these bytes, so the
+    # write and the antivirus rescan it would trigger can be skipped — but
+    # only if the file still carries our post-write stat signature; another
+    # governor process may have replaced it since (the cache is per-process
+    # while the config files are shared)
+    digest = hashlib.blake2b(payload, digest_size=16).digest()
+    if _written_config_hashes.get(path) == (digest, _stat_signature(path)):
+        return
+    # Write-then-rename so the exe can never observe a half-written config,
+    # e.g. when parallel compare passes race a slow flush
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as config_file:
+        config_file.write(payload)
+    os.replace(tmp_path, path)
+    _written_config_hashes[path] = (digest, _stat_signature(path))
+
+
+def apply_config(config_data, pretty=False):
+    _dump_config(
+        config_data["sample"], os.path.join(FSR_DIR, "configs/fsrconfig.json"), pretty
+    )
+    _dump_config(
+        config_data["framework"],
+        os.path.join(FSR_DIR, "configs/cauldronconfig.json"),
+        pretty,
+    )
+
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Run FSR tests")
     parser.add_argument(
         "--render-res",
@@ -369,8 +510,9 @@ def parse_args():
     parser.add_argument(
         "--compare",
         type=str,
+        nargs="+",
         choices=["ssim", "psnr", "mse"],
-        help="Enable comparison with the reference image, will run the same configuration but without upscaler",
+        help="Enable comparison with the reference image, will run the same configuration but without upscaler. Several metrics may be requested at once; the images are decoded a single time",
     )
     parser.add_argument(
         "--compare-fps",
@@ -391,46 +533,302 @@ def parse_args():
         default="Native",
         choices=UPSCALERS,
     )
+    parser.add_argument(
+        "--parallel-compare",
+        action="store_true",
+        default=False,
+        help="Run the test and reference passes concurrently; requires enough GPU headroom for both",
+    )
+    parser.add_argument(
+        "--gpu-metrics",
+        action="store_true",
+        default=False,
+        help="Compute the comparison metrics on the GPU via torch, if available",
+    )
+    parser.add_argument(
+        "--ssim-scale",
+        type=int,
+        default=1,
+        help="Downsample factor applied before SSIM; trades accuracy for an s^2 cost cut",
+    )
+    parser.add_argument(
+        "--fast-ssim",
+        action="store_true",
+        default=False,
+        help="Use the OpenCV-based SSIM instead of skimage, faster but slightly off parity",
+    )
+    parser.add_argument(
+        "--ssim-luma",
+        action="store_true",
+        default=False,
+        help="Compute SSIM on Rec. 709 luminance only, one channel instead of three",
+    )
+    parser.add_argument(
+        "--startup-grace",
+        type=float,
+        default=10,
+        help="Maximum seconds to wait for a process window before falling back to a fixed delay",
+    )
+    parser.add_argument(
+        "--metric-worker",
+        action="store_true",
+        default=False,
+        help="Serve metric requests over stdin/stdout instead of running a test; amortizes interpreter startup across comparisons",
+    )
+    parser.add_argument(
+        "--sweep",
+        type=str,
+        help="Run every point from a JSON sweep file in this one interpreter; each entry is a dict of argument overrides applied on top of the command line",
+    )
+    parser.add_argument(
+        "--pin-affinity",
+        action="store_true",
+        default=False,
+        help="Pin the governor to core 0 and raise the render processes to high priority",
+    )
+    parser.add_argument(
+        "--show-diff",
+        action="store_true",
+        default=False,
+        help="Display the difference image interactively instead of saving it",
+    )
+    parser.add_argument(
+        "--pretty-config",
+        action="store_true",
+        default=False,
+        help="Write the generated configs indented for easier debugging",
+    )
     parser.add_argument(
         "--enable-cursor-jitter",
         action="store_true",
         default=False,
         help="Enable cursor jitter",
     )
-    return parser.parse_args()
+    args = parser.parse_args(argv)
+    # Resolutions are fixed for the life of a run; tuples make them directly
+    # usable as cache-key components and guard against accidental mutation
+    args.render_res = tuple(args.render_res)
+    args.present_res = tuple(args.present_res)
+    return args
+
+
+# Cache of pid -> hwnd so repeat lookups (focus, then close) skip the full
+# EnumWindows scan and its per-window Python callback
+_hwnd_cache = {}
+
+_user32 = ctypes.windll.user32
+_WNDENUMPROC = ctypes.WINFUNCTYPE(
+    ctypes.wintypes.BOOL, ctypes.wintypes.HWND, ctypes.wintypes.LPARAM
+)
+
+_kernel32 = ctypes.windll.kernel32
+# Affinity masks are DWORD_PTR; without explicit argtypes ctypes marshals
+# them through a 32-bit C int and silently drops cores 32+ on big machines
+_kernel32.GetCurrentProcess.restype = ctypes.wintypes.HANDLE
+_kernel32.SetProcessAffinityMask.argtypes = (
+    ctypes.wintypes.HANDLE,
+    ctypes.c_size_t,
+)
+_kernel32.GetProcessAffinityMask.argtypes = (
+    ctypes.wintypes.HANDLE,
+    ctypes.POINTER(ctypes.c_size_t),
+    ctypes.POINTER(ctypes.c_size_t),
+)
 
 
 def find_window_by_pid(pid, window_title="FidelityFX FSR"):
-    def enum_windows_callback(hwnd, windows):
-        if win32gui.IsWindowVisible(hwnd) and win32gui.IsWindowEnabled(hwnd):
-            _, found_pid = win32process.GetWindowThreadProcessId(hwnd)
-            if found_pid == pid:
-                title = win32gui.GetWindowText(hwnd)
-                if window_title is None or title == window_title:
-                    windows.append(hwnd)
+    hwnd = _hwnd_cache.get(pid)
+    if hwnd is not None:
+        if _user32.IsWindow(hwnd):
+            return hwnd
+        del _hwnd_cache[pid]
 
     windows = []
-    win32gui.EnumWindows(enum_windows_callback, windows)
-    return windows[0] if windows else None
+    owner_pid = ctypes.wintypes.DWORD()
+    title_buf = ctypes.create_unicode_buffer(128)
+
+    # Raw user32 calls keep the per-window cost to the syscall itself; the
+    # pywin32 wrappers add argument marshalling on every one of the hundreds
+    # of desktop windows the enumeration visits
+    @_WNDENUMPROC
+    def enum_windows_callback(hwnd, lparam):
+        # Cheapest filter first: the pid rejects almost every window with a
+        # single syscall, so the style and title reads only run for ours
+        _user32.GetWindowThreadProcessId(hwnd, ctypes.byref(owner_pid))
+        if owner_pid.value != pid:
+            return True
+        if _user32.IsWindowVisible(hwnd) and _user32.IsWindowEnabled(hwnd):
+            length = _user32.GetWindowTextW(hwnd, title_buf, len(title_buf))
+            if window_title is None or title_buf[:length] == window_title:
+                windows.append(hwnd)
+                # Returning False stops the enumeration at the first match
+                return False
+        return True
+
+    _user32.EnumWindows(enum_windows_callback, 0)
+    if not windows:
+        return None
+    _hwnd_cache[pid] = windows[0]
+    return windows[0]
 
 
 def focus_by_pid(pid):
     hwnd = find_window_by_pid(pid)
     if hwnd:
         ctypes.windll.user32.SetForegroundWindow(hwnd)
-        ctypes.windll.user32.ShowWindow(hwnd, win32con.SW_RESTORE)
+        ctypes.windll.user32.ShowWindow(hwnd, SW_RESTORE)
         return True
     return False
 
 
+def wait_for_window(pid, timeout=10):
+    """Poll for the process' main window instead of sleeping a fixed grace.
+
+    Returns True once the window exists; False if the timeout elapsed.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if find_window_by_pid(pid) is not None:
+            return True
+        time.sleep(0.05)
+    return False
+
+
 def close_by_pid(pid):
     hwnd = find_window_by_pid(pid)
     if hwnd:
-        win32api.PostMessage(hwnd, win32con.WM_QUIT, 0, 0)
+        # WM_CLOSE asks the window to close itself; WM_QUIT posted to a
+        # window is ignored (it belongs on the thread's message queue), which
+        # made every cleanup fall through to the kill timeout
+        _user32.PostMessageW(hwnd, WM_CLOSE, 0, 0)
+        # The window is going away; don't hand the stale hwnd to later calls
+        _hwnd_cache.pop(pid, None)
         return True
     return False
 
 
+WM_CLOSE = 0x0010
+SW_RESTORE = 9
+WAIT_TIMEOUT = 0x00000102
+HIGH_PRIORITY_CLASS = 0x00000080
+ES_CONTINUOUS = 0x80000000
+ES_SYSTEM_REQUIRED = 0x00000001
+ES_DISPLAY_REQUIRED = 0x00000002
+
+
+def _boost_process(proc, affinity_mask=None):
+    """Raise a child process to HIGH_PRIORITY_CLASS and optionally pin it.
+
+    Keeps the renderer/upscaler from being preempted by background work,
+    which mostly shows up as benchmark variance. Applying this right after
+    spawn covers the CREATE_SUSPENDED case in practice: the child spends its
+    first hundreds of milliseconds in device init before rendering a frame,
+    and Popen exposes no thread handle to resume anyway.
+    """
+    handle = int(proc._handle)
+    _kernel32.SetPriorityClass(handle, HIGH_PRIORITY_CLASS)
+    if affinity_mask:
+        _kernel32.SetProcessAffinityMask(handle, affinity_mask)
+
+
+def process_handles(processes):
+    """Build a HANDLE array for wait_on_handles.
+
+    The handles stay valid for the lifetime of the Popen objects, so one
+    array built up front can serve every wait of a run.
+    """
+    return (ctypes.wintypes.HANDLE * len(processes))(
+        *(int(p._handle) for p in processes)
+    )
+
+
+def wait_on_handles(handles, timeout_ms, wait_all=False):
+    """Block on the handles until they signal or the timeout elapses.
+
+    Kernel-level wait instead of a fixed sleep, so a child exit wakes us
+    immediately rather than up to a full poll interval later. Waits for any
+    handle by default, or all of them with ``wait_all``. Returns True when
+    the wait was satisfied.
+    """
+    result = ctypes.windll.kernel32.WaitForMultipleObjects(
+        len(handles), handles, wait_all, timeout_ms
+    )
+    return result != WAIT_TIMEOUT
+
+
+def wait_for_processes(processes, timeout_ms):
+    """One-shot convenience wrapper: build the handle array and wait."""
+    return wait_on_handles(process_handles(processes), timeout_ms)
+
+
+_pyautogui = None
+
+
+def _import_pyautogui():
+    # Deferred: pyautogui (and the PIL stack behind it) is only needed on
+    # the interactive focus/jiggle paths, never for library use
+    global _pyautogui
+    if _pyautogui is None:
+        import pyautogui
+
+        pyautogui.FAILSAFE = False
+        _pyautogui = pyautogui
+    return _pyautogui
+
+
+def _cursor_pos():
+    # Single user32 call; pyautogui.position() layers screenshot-safety
+    # checks and tuple wrapping on top of the same API
+    point = ctypes.wintypes.POINT()
+    ctypes.windll.user32.GetCursorPos(ctypes.byref(point))
+    return point.x, point.y
+
+
+def _jiggle_loop(stop_event, interval=30):
+    """Periodically jiggle the mouse to prevent the screen from turning off.
+
+    Runs on a daemon thread so the blocking pyautogui moves never delay the
+    main loop's process waits.
+    """
+    pyautogui = _import_pyautogui()
+    while not stop_event.wait(interval):
+        cursor_pos = _cursor_pos()
+        if (
+            cursor_pos[0] > 500
+            and cursor_pos[1] > 500
+            and cursor_pos[0] < 900
+            and cursor_pos[1] < 900
+        ):
+            pyautogui.moveTo(600, 600)
+            pyautogui.moveRel(
+                100,
+                random.randint(0, 100),
+                duration=0.25,
+                tween=pyautogui.easeInOutQuad,
+            )
+
+
+def _wait_until_running(proc):
+    """Block until the process prints its "Running" startup marker.
+
+    The pipe itself is the completion signal: a blocking readline yields the
+    CPU until the child writes, instead of spinning a non-blocking read with
+    a 100ms sleep. Also returns on EOF so a crashed child can't hang us.
+    """
+    fd = proc.stdout.fileno()
+    os.set_blocking(fd, True)
+    buf = bytearray()
+    while b"Running" not in buf:
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            break
+        buf += chunk
+    # Bytes after the marker in the final chunk are discarded; that is safe
+    # because telemetry only starts once the benchmark is actually running
+    # The telemetry drain in the main loop relies on non-blocking reads
+    os.set_blocking(fd, False)
+
+
 def get_process_args(
     mode, screenshot_mode=None, duration=0, has_fg=False, hide_ui=False
 ):
@@ -465,6 +863,26 @@ def get_process_args(
 
 
 def main(opts):
+    child_affinity = None
+    if opts.pin_affinity:
+        # Keep the governor on a single small core; the render processes get
+        # the rest plus a priority boost after they spawn
+        _kernel32.SetProcessAffinityMask(_kernel32.GetCurrentProcess(), 0x1)
+        # An affinity mask is one DWORD_PTR, so it can only name the first 64
+        # logical processors; on bigger machines the extra cores live in other
+        # processor groups and are out of reach of this API anyway
+        child_affinity = ((1 << min(os.cpu_count(), 64)) - 1) & ~0x1
+        # Trim to the processors actually available to us; the system mask is
+        # unaffected by the self-pin above
+        process_mask = ctypes.c_size_t()
+        system_mask = ctypes.c_size_t()
+        if _kernel32.GetProcessAffinityMask(
+            _kernel32.GetCurrentProcess(),
+            ctypes.byref(process_mask),
+            ctypes.byref(system_mask),
+        ):
+            child_affinity &= system_mask.value
+
     # Default process arguments
     exe_name = (
         "FFX_FSR_NATIVE_DX12.exe"
@@ -490,6 +908,9 @@ def main(opts):
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             stdin=subprocess.DEVNULL,
+            # Console-less spawn: skips conhost allocation inside
+            # CreateProcess and keeps stray windows off the desktop
+            creationflags=subprocess.CREATE_NO_WINDOW,
         )
         if relay.poll() is not None:
             raise ValueError("Failed to start the relay process")
@@ -506,6 +927,7 @@ def main(opts):
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
             stdin=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW,
         )
         if web.poll() is not None:
             raise ValueError("Failed to start the web server process")
@@ -531,85 +953,86 @@ def main(opts):
     # Create the renderer process
     mode = "Default" if opts.use_default else "Renderer"
     renderer_config = get_config(mode, opts)
-    apply_config(renderer_config)
-    if not opts.skip_renderer:
-        renderer = subprocess.Popen(
-            [
-                os.path.join(FSR_DIR, exe_name),
-                *get_process_args(
-                    mode,
-                    screenshot_mode=opts.screenshot,
-                    duration=opts.benchmark * opts.fps,
-                    has_fg=opts.upscaler in FRAME_GENERATION,
-                    hide_ui=opts.hide_ui,
-                ),
-            ],
-            cwd=FSR_DIR,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            stdin=subprocess.DEVNULL,
-        )
-        if opts.structured_logs:
-            print("RENDERER_PID", renderer.pid)
-            sys.stdout.flush()
+    with _spawn_lock:
+        apply_config(renderer_config, pretty=opts.pretty_config)
+        if not opts.skip_renderer:
+            renderer = subprocess.Popen(
+                [
+                    os.path.join(FSR_DIR, exe_name),
+                    *get_process_args(
+                        mode,
+                        screenshot_mode=opts.screenshot,
+                        duration=opts.benchmark * opts.fps,
+                        has_fg=opts.upscaler in FRAME_GENERATION,
+                        hide_ui=opts.hide_ui,
+                    ),
+                ],
+                cwd=FSR_DIR,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+            )
+            if opts.pin_affinity:
+                _boost_process(renderer, child_affinity)
+            if opts.structured_logs:
+                print("RENDERER_PID", renderer.pid)
+                sys.stdout.flush()
+            else:
+                print(f"Renderer PID: {renderer.pid}")
+
+            # Wait until the renderer is ready
+            _wait_until_running(renderer)
         else:
-            print(f"Renderer PID: {renderer.pid}")
-
-        # Wait until the renderer is ready
-        os.set_blocking(renderer.stdout.fileno(), False)
-        while True:
-            line = renderer.stdout.readline()
-            if b"Running" in line:
-                break
-            time.sleep(0.1)
-    else:
-        input("Press Enter to continue...")
+            input("Press Enter to continue...")
 
     # Default mode implies skipping the upscaler
     skip_upscaler = opts.skip_upscaler
     if opts.use_default:
         opts.skip_upscaler = True
 
-    # Wait until the renderer is ready
+    # Wait until the renderer is ready; the window poll usually returns within
+    # a few hundred ms, the fixed sleep is only the fallback
     if not opts.use_default:
-        time.sleep(2)
+        if opts.skip_renderer or not wait_for_window(
+            renderer.pid, opts.startup_grace
+        ):
+            time.sleep(2)
 
-        # Create the upscaler process
-        upscaler_config = get_config("Upscaler", opts)
-        apply_config(upscaler_config)
-        # We do not encapsulate config creation in the following
-        # if statement because we may use Visual Studio to debug the upscaler
+    with _spawn_lock:
+        if not opts.use_default:
+            # Create the upscaler process
+            upscaler_config = get_config("Upscaler", opts)
+            apply_config(upscaler_config, pretty=opts.pretty_config)
+            # We do not encapsulate config creation in the following
+            # if statement because we may use Visual Studio to debug the upscaler
 
-    if not opts.skip_upscaler:
-        upscaler = subprocess.Popen(
-            [
-                os.path.join(FSR_DIR, exe_name),
-                *get_process_args(
-                    "Upscaler",
-                    screenshot_mode=opts.screenshot,
-                    duration=opts.benchmark * opts.fps,
-                    has_fg=opts.upscaler in FRAME_GENERATION,
-                    hide_ui=opts.hide_ui,
-                ),
-            ],
-            cwd=FSR_DIR,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
-            stdin=subprocess.DEVNULL,
-        )
-        if opts.structured_logs:
-            print("UPSCALER_PID", upscaler.pid)
-            sys.stdout.flush()
-        else:
-            print(f"Upscaler PID: {upscaler.pid}")
+        if not opts.skip_upscaler:
+            upscaler = subprocess.Popen(
+                [
+                    os.path.join(FSR_DIR, exe_name),
+                    *get_process_args(
+                        "Upscaler",
+                        screenshot_mode=opts.screenshot,
+                        duration=opts.benchmark * opts.fps,
+                        has_fg=opts.upscaler in FRAME_GENERATION,
+                        hide_ui=opts.hide_ui,
+                    ),
+                ],
+                cwd=FSR_DIR,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+            )
+            if opts.pin_affinity:
+                _boost_process(upscaler, child_affinity)
+            if opts.structured_logs:
+                print("UPSCALER_PID", upscaler.pid)
+                sys.stdout.flush()
+            else:
+                print(f"Upscaler PID: {upscaler.pid}")
 
-        # Wait until the upscaler is ready
-        os.set_blocking(upscaler.stdout.fileno(), False)
-        while True:
-            line = upscaler.stdout.readline()
-            if b"Running" in line:
-                break
-            time.sleep(0.1)
+            # Wait until the upscaler is ready
+            _wait_until_running(upscaler)
 
     # Register signal handlers
     def cleanup(sig, _, non_zero=False):
@@ -617,22 +1040,20 @@ def main(opts):
             print()
             print("Cleaning up...")
 
-        # Try to gracefully close the processes
+        # Try to gracefully close the processes, then block on both handles
+        # with a single wait-all; overlapping the shutdowns instead of
+        # waiting for each in turn halves the worst-case tail
+        closing = []
         if not opts.skip_renderer and renderer.poll() is None:
             close_by_pid(renderer.pid)
-
-            # Wait for 5 seconds for the renderer to close
-            start_time = time.time()
-            while renderer.poll() is None and time.time() - start_time < 5:
-                time.sleep(0.1)
+            closing.append(renderer)
 
         if not opts.skip_upscaler and upscaler.poll() is None:
             close_by_pid(upscaler.pid)
+            closing.append(upscaler)
 
-            # Wait for 5 seconds for the upscaler to close
-            start_time = time.time()
-            while upscaler.poll() is None and time.time() - start_time < 5:
-                time.sleep(0.1)
+        if closing:
+            wait_on_handles(process_handles(closing), 5000, wait_all=True)
 
         # Kill the processes if they are still running
         if not opts.skip_renderer and renderer.poll() is None:
@@ -646,9 +1067,13 @@ def main(opts):
             relay.kill()
             web.kill()
 
-        # Exit with the appropriate code
+        # Only a signal handler may terminate the interpreter; when cleanup
+        # runs as part of a normal session the status is returned instead so
+        # a sweep can carry on with its remaining points
         if non_zero:
-            sys.exit(1)
+            if sig is not None:
+                sys.exit(1)
+            return 1
 
         # Get the return codes
         return_codes = {
@@ -661,38 +1086,73 @@ def main(opts):
             print(json.dumps(return_codes, indent=4))
 
         if not opts.compare:
+            status = 0
             for value in return_codes.values():
                 if value is not None and value != 0:
-                    sys.exit(value)
-            sys.exit(0)
+                    status = value
+                    break
+            if sig is not None:
+                sys.exit(status)
+            return status
 
         if opts.compare and sig is not None:
             print(
                 "In comparison mode, exiting is not allowed. You must wait for the test to finish."
             )
+        return 0
 
-    signal.signal(signal.SIGINT, cleanup)
-    signal.signal(signal.SIGTERM, cleanup)
+    # Signal handlers can only be registered from the main thread; in parallel
+    # compare mode the worker runs rely on the benchmark watchdog instead
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, cleanup)
+        signal.signal(signal.SIGTERM, cleanup)
 
     if not skip_upscaler:
         # Focus the renderer or upscaler window
-        assert focus_by_pid(renderer.pid if opts.use_default else upscaler.pid), (
+        focus_pid = renderer.pid if opts.use_default else upscaler.pid
+        wait_for_window(focus_pid, opts.startup_grace)
+        assert focus_by_pid(focus_pid), (
             "Could not focus the window. "
             "Please make sure the window is visible and not minimized."
         )
 
         if opts.enable_cursor_jitter:
             # In case focus fails, try manual focus
+            pyautogui = _import_pyautogui()
             pyautogui.moveTo(40, 20)
             pyautogui.click()
             pyautogui.moveTo(120, 20)
             pyautogui.click()
 
     dots = 0
+    # Carriage-return progress animation only makes sense on a console; when
+    # output is piped each frame would be a wasted write syscall in the log
+    show_progress = not opts.structured_logs and sys.stdout.isatty()
     start_time = time.time()
+    # Tell Windows the display and system must stay up for the duration of
+    # the test; screenshots from a blanked display are useless
+    ctypes.windll.kernel32.SetThreadExecutionState(
+        ES_CONTINUOUS | ES_SYSTEM_REQUIRED | ES_DISPLAY_REQUIRED
+    )
+    jiggle_stop = threading.Event()
+    if opts.enable_cursor_jitter:
+        threading.Thread(
+            target=_jiggle_loop, args=(jiggle_stop,), daemon=True
+        ).start()
     if opts.structured_logs:
         print("TEST_START", utcnow_iso8601())
         sys.stdout.flush()
+
+    # The watched set is fixed for the whole run; build the list and the
+    # kernel handle array once so each loop pass only pays the wait itself
+    watched = []
+    if not opts.skip_renderer:
+        watched.append(renderer)
+    if not opts.skip_upscaler:
+        watched.append(upscaler)
+    watched_handles = process_handles(watched)
+
+    timed_out = False
     while True:
         # Check if the renderer is still running
         if not opts.skip_renderer and renderer.poll() is not None:
@@ -702,39 +1162,20 @@ def main(opts):
         if not opts.skip_upscaler and upscaler.poll() is not None:
             break
 
-        # If mouse is within jiggling range, move it
-        cursor_pos = pyautogui.position()
-        if (
-            opts.enable_cursor_jitter
-            and cursor_pos[0] > 500
-            and cursor_pos[1] > 500
-            and cursor_pos[0] < 900
-            and cursor_pos[1] < 900
-        ):
-            # Jiggle the mouse to prevent the screen from turning off
-            pyautogui.moveTo(600, 600)
-            pyautogui.moveRel(
-                100,
-                random.randint(0, 100),
-                duration=0.25,
-                tween=pyautogui.easeInOutQuad,
-            )
-
         # Bail out if test is taking too long
         if (
             opts.benchmark > 0
             and time.time() - start_time > opts.benchmark + 15
             and opts.screenshot != "video"
         ):
-            cleanup(None, None, non_zero=True)
+            timed_out = True
             break
 
-        # Check telemetry
-        processes = []
-        if not opts.skip_renderer:
-            processes.append(renderer)
-        if not opts.skip_upscaler:
-            processes.append(upscaler)
+        # Check telemetry. This drain also keeps the stdout pipes from
+        # filling and blocking the children, so it must run every pass;
+        # the pipes cannot be redirected to NUL after startup without
+        # losing the telemetry stream.
+        processes = list(watched)
 
         while processes:
             p = processes[-1]
@@ -750,41 +1191,170 @@ def main(opts):
             if opts.structured_logs:
                 print(f"TELEMETRY_{p.pid}", line.decode().strip())
                 sys.stdout.flush()
-            else:
+            elif show_progress:
                 values = json.loads(data.group(1).decode().strip())
                 print(
                     f"Got telemetry for {p.pid}: min={values['delta_ms']:.4f}ms{'.' * dots + ' ' * (4 - dots)}",
                     end="\r",
                 )
 
-        if not opts.structured_logs and opts.benchmark > 0:
+        if show_progress and opts.benchmark > 0:
             print(
                 f"Waiting for process(es) to finish{'.' * dots + ' ' * (4 - dots)}",
                 end="\r" if not opts.skip_upscaler else "\n",
             )
         dots = (dots + 1) % 4
-        time.sleep(0.5)
 
+        # Block on the process handles instead of sleeping; a child exit is
+        # observed immediately instead of up to 500ms later
+        if watched:
+            wait_on_handles(watched_handles, 500)
+        else:
+            time.sleep(0.5)
+
+    jiggle_stop.set()
+    # Clear the display/system requirements now that the test is over
+    ctypes.windll.kernel32.SetThreadExecutionState(ES_CONTINUOUS)
     if opts.structured_logs:
         print("TEST_END", utcnow_iso8601())
         sys.stdout.flush()
     else:
         print()
         print("Process(es) finished")
-    cleanup(None, None)
+    status = cleanup(None, None, non_zero=timed_out)
 
-    return renderer.pid if opts.use_default else upscaler.pid
+    return renderer.pid if opts.use_default else upscaler.pid, status
 
 
-def load_image_for_pid(pid):
-    image_path = glob(os.path.join(FSR_DIR, "benchmark", f"*_{pid}_*.jpg"))
-    assert len(image_path) == 1, "Could not find the image"
-    return img_as_float(io.imread(image_path[0]))
 
 
-if __name__ == "__main__":
-    args = parse_args()
+def _find_image_for_pid(pid):
+    # A plain scandir pass with a substring test beats glob's per-entry
+    # fnmatch regex once the benchmark directory accumulates screenshots
+    needle = f"_{pid}_"
+    matches = [
+        entry.path
+        for entry in os.scandir(BENCHMARK_DIR)
+        if entry.name.endswith(".jpg") and needle in entry.name
+    ]
+    assert len(matches) == 1, "Could not find the image"
+    return matches[0]
+
+
+# The caches below return shared arrays; treat them as read-only and copy
+# before mutating. Keyed by pid, so a metric recomputation skips the decode.
+@functools.lru_cache(maxsize=4)
+def load_image_u8_for_pid(pid):
+    image_path = _find_image_for_pid(pid)
+    if _turbojpeg is not None:
+        with open(image_path, "rb") as image_file:
+            return _turbojpeg.decode(image_file.read(), pixel_format=TJPF_RGB)
+    return io.imread(image_path)
+
+
+@functools.lru_cache(maxsize=4)
+def load_image_for_pid(pid):
+    image_path = _find_image_for_pid(pid)
+    if _turbojpeg is not None:
+        # libjpeg-turbo decodes with a SIMD IDCT, typically 2-4x faster than
+        # the Pillow path, and the float32 scale is a single fused multiply
+        with open(image_path, "rb") as image_file:
+            rgb = _turbojpeg.decode(image_file.read(), pixel_format=TJPF_RGB)
+        return rgb.astype(np.float32) * np.float32(1 / 255.0)
+    # float32 is lossless for 8-bit JPEG sources and halves the bandwidth
+    # of every downstream metric kernel
+    return img_as_float32(io.imread(image_path))
+
+
+_decode_pool = ThreadPoolExecutor(max_workers=2)
+
+
+def _decode_pair(loader, test_pid, ref_pid):
+    # libjpeg releases the GIL, so decoding the two images concurrently
+    # costs one decode latency instead of two; cache hits return instantly
+    return tuple(_decode_pool.map(loader, (test_pid, ref_pid)))
+
+
+def compute_metrics(test_pid, ref_pid, wanted, args):
+    """Compute every metric in ``wanted`` over one pair of decoded images.
+
+    MSE/PSNR share a single squared-error pass and, when possible, stay in
+    the integer domain since the JPEG sources only carry 8-bit precision.
+    Returns a dict mapping metric name to value, in request order.
+    """
+    wanted = list(dict.fromkeys(wanted))
+    results = {}
+    if not args.gpu_metrics and ("mse" in wanted or "psnr" in wanted):
+        mse = mse_uint8(*_decode_pair(load_image_u8_for_pid, test_pid, ref_pid))
+        if "mse" in wanted:
+            results["mse"] = mse
+        if "psnr" in wanted:
+            results["psnr"] = psnr_from_mse(mse)
+    remaining = [name for name in wanted if name not in results]
+    if remaining:
+        test_image, ref_image = _decode_pair(load_image_for_pid, test_pid, ref_pid)
+        float_mse = None
+        for name in remaining:
+            ssim_test, ssim_ref = test_image, ref_image
+            if name == "ssim" and args.ssim_scale > 1:
+                # Mean-pool before the metric; approximates the coarsest
+                # MS-SSIM pyramid level at 1/s^2 the cost
+                from skimage.transform import downscale_local_mean
+
+                scale = (args.ssim_scale, args.ssim_scale, 1)
+                ssim_test = downscale_local_mean(test_image, scale)
+                ssim_ref = downscale_local_mean(ref_image, scale)
+            metric = (
+                gpu_metrics(ssim_test, ssim_ref, name) if args.gpu_metrics else None
+            )
+            if metric is not None:
+                pass
+            elif name == "ssim":
+                if args.ssim_luma:
+                    metric = ssim_luma(ssim_test, ssim_ref)
+                elif args.fast_ssim:
+                    metric = fast_ssim(ssim_test, ssim_ref)
+                else:
+                    metric = ssim_parallel(ssim_test, ssim_ref)
+            else:
+                if float_mse is None:
+                    float_mse = mse_float(test_image, ref_image)
+                metric = float_mse if name == "mse" else psnr_from_mse(float_mse)
+            results[name] = metric
+    return {name: results[name] for name in wanted}
+
+
+def run_metric_worker():
+    """Serve metric requests over stdin/stdout until EOF.
+
+    Keeps one warm interpreter (NumPy/skimage imports, JIT caches, the
+    decoded-image cache) across many comparisons. Drivers send one JSON
+    request per line: {"test": <pid>, "ref": <pid>, "metric": "ssim"} and
+    read back a single METRIC_* line per request.
+    """
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = json.loads(line)
+        metric_name = request["metric"]
+        if metric_name in ("mse", "psnr"):
+            mse = mse_uint8(
+                *_decode_pair(load_image_u8_for_pid, request["test"], request["ref"])
+            )
+            value = mse if metric_name == "mse" else psnr_from_mse(mse)
+        elif metric_name == "ssim":
+            value = ssim_parallel(
+                *_decode_pair(load_image_for_pid, request["test"], request["ref"])
+            )
+        else:
+            print("METRIC_ERROR", f"unknown metric {metric_name}", flush=True)
+            continue
+        print(f"METRIC_{metric_name.upper()}", value, flush=True)
+
 
+def run_session(args):
+    """Run one benchmark (and its reference pass) and emit metrics/diffs."""
     if args.compare:
         assert (
             args.screenshot != "video"
@@ -793,52 +1363,156 @@ if __name__ == "__main__":
     if args.skip_renderer and args.skip_upscaler:
         raise ValueError("Both renderer and upscaler cannot be skipped")
 
-    # Run with the requested arguments
-    test_pid = main(args)
-    sys.stdout.flush()
-
+    # Prepare the reference configuration
     if args.compare:
-        # Run the same configuration without the upscaler
-        compare_args = parse_args()
+        compare_args = argparse.Namespace(**vars(args))
         compare_args.upscaler = args.compare_with
         compare_args.fps = args.compare_fps
         if compare_args.switch_default_mode:
             compare_args.use_default = not args.use_default
         if compare_args.upscaler == "Native":
             compare_args.render_res = compare_args.present_res
-        ref_pid = main(compare_args)
 
-        # Load the images
-        test_image = load_image_for_pid(test_pid)
-        ref_image = load_image_for_pid(ref_pid)
+    # Run with the requested arguments
+    if args.compare and args.parallel_compare:
+        # Overlap the two benchmark passes; the spawn lock keeps the shared
+        # config files consistent while each process starts up
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            test_future = pool.submit(main, args)
+            ref_future = pool.submit(main, compare_args)
+            test_pid, test_status = test_future.result()
+            ref_pid, ref_status = ref_future.result()
+        sys.stdout.flush()
+    else:
+        ref_status = 0
+        test_pid, test_status = main(args)
+        sys.stdout.flush()
+        if args.compare:
+            # Run the same configuration without the upscaler
+            ref_pid, ref_status = main(compare_args)
 
-        # Calculate the metrics
-        if args.compare == "ssim":
-            metric = structural_similarity(
-                test_image, ref_image, data_range=1, channel_axis=2
-            )
-        elif args.compare == "psnr":
-            metric = peak_signal_noise_ratio(test_image, ref_image, data_range=1)
-        elif args.compare == "mse":
-            metric = mean_squared_error(test_image, ref_image)
-        else:
-            raise ValueError("Invalid metric")
+    if not args.compare:
+        return test_status
+
+    if args.compare:
+        # A failed or timed-out pass leaves no usable screenshots behind
+        if test_status or ref_status:
+            return test_status or ref_status
+
+        # Compute every requested metric over a single pair of decoded images
+        metrics = compute_metrics(test_pid, ref_pid, args.compare, args)
 
-        # Print the metric
+        # Print the metrics
         if not args.structured_logs:
-            print(f"{args.compare.upper()}: {metric:.6f}")
+            for name, metric in metrics.items():
+                print(f"{name.upper()}: {metric:.6f}")
         else:
-            print(f"METRIC_{args.compare.upper()}", metric)
+            for name, metric in metrics.items():
+                print(f"METRIC_{name.upper()}", metric)
             sys.stdout.flush()
-            exit(0)
-
-        # Calculate the difference image
-        diff = np.abs(test_image - ref_image)
-        ref_image[diff > 0.02] = 1
-
-        # Show the difference
-        fig, ax = plt.subplots(figsize=(16 * 1.5, 9 * 1.5))
-        ax.imshow(ref_image)
-        plt.title(f"{args.compare.upper()} = {metric:.6f}")
-        fig.tight_layout()
-        plt.show()
+            return 0
+
+        # The loader caches the decoded arrays, so this is free when the
+        # float path already ran and a single decode otherwise
+        test_image = load_image_for_pid(test_pid)
+        ref_image = load_image_for_pid(ref_pid)
+
+        # Calculate the difference mask with a single reusable buffer; out=
+        # keeps the subtract/abs in place and the reduction yields an HxW mask
+        diff = np.empty_like(test_image)
+        np.subtract(test_image, ref_image, out=diff)
+        np.abs(diff, out=diff)
+        diff_max = np.empty(diff.shape[:2], dtype=diff.dtype)
+        diff.max(axis=2, out=diff_max)
+        mask = np.empty(diff_max.shape, dtype=bool)
+        np.greater(diff_max, 0.02, out=mask)
+        highlight = ref_image.copy()  # the loader caches the decoded array
+        highlight[mask] = 1
+
+        # Show the difference; matplotlib is imported lazily so the common
+        # path never pays its import cost, and headless runs save to disk.
+        # uint8 up front spares matplotlib a float normalization pass.
+        display = (np.clip(highlight, 0, 1) * 255).astype(np.uint8)
+        if args.show_diff:
+            import matplotlib.pyplot as plt
+
+            fig, ax = plt.subplots(figsize=(16 * 1.5, 9 * 1.5))
+            ax.imshow(display)
+            title = ", ".join(f"{n.upper()} = {v:.6f}" for n, v in metrics.items())
+            plt.title(title)
+            fig.tight_layout()
+            plt.show()
+        else:
+            diff_path = os.path.join(BENCHMARK_DIR, f"diff_{test_pid}_{ref_pid}.png")
+            io.imsave(diff_path, display)
+            print(f"Difference image saved to {diff_path}")
+
+    return 0
+
+
+def _point_argv(overrides):
+    """Turn one sweep entry into command-line tokens for parse_args."""
+    argv = []
+    for name, value in overrides.items():
+        flag = name if name.startswith("-") else "--" + name.replace("_", "-")
+        if isinstance(value, bool):
+            if value:
+                argv.append(flag)
+        elif isinstance(value, list):
+            argv.append(flag)
+            argv.extend(str(item) for item in value)
+        else:
+            argv.extend([flag, str(value)])
+    return argv
+
+
+def run_sweep(args):
+    """Run every point of a sweep file from this one warm interpreter.
+
+    The file holds a JSON list of argument dicts; each is applied on top of
+    the launching command line. Looping in-process avoids one interpreter
+    start, config load and import pass per point, and keeps the decoded-image
+    and config caches warm across points.
+    """
+    points = _load_json(args.sweep)
+    # Rebuild the base command line without the sweep flag; argparse accepts
+    # "--sweep FILE", "--sweep=FILE" and unambiguous abbreviations, and all
+    # of them must go or every point would recurse into run_sweep. "--swe"
+    # is the shortest spelling argparse allows ("--sw" would be ambiguous
+    # with --switch-default-mode), so any prefix of "--sweep" at least that
+    # long identifies the flag.
+    base_argv = []
+    skip_next = False
+    for token in sys.argv[1:]:
+        if skip_next:
+            skip_next = False
+            continue
+        flag, _, value = token.partition("=")
+        if flag.startswith("--swe") and "--sweep".startswith(flag):
+            skip_next = not value
+            continue
+        base_argv.append(token)
+    status = 0
+    for index, point in enumerate(points):
+        print(f"Sweep point {index + 1}/{len(points)}: {point}")
+        point_args = parse_args(base_argv + _point_argv(point))
+        # A failed point marks the sweep but never aborts the remaining ones
+        status = run_session(point_args) or status
+        sys.stdout.flush()
+    return status
+
+
+if __name__ == "__main__":
+    # Line-buffered stdout so drivers reading our pipe see METRIC_*/TELEMETRY_*
+    # lines as they happen instead of on block-buffer flushes
+    sys.stdout.reconfigure(line_buffering=True)
+    args = parse_args()
+
+    if args.metric_worker:
+        run_metric_worker()
+        sys.exit(0)
+
+    if args.sweep:
+        sys.exit(run_sweep(args))
+
+    sys.exit(run_session(args))
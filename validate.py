@@ -1,39 +1,53 @@
 import os
 import glob
+import json
 import time
+import argparse
+import functools
+import threading
+import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 __doc__ = """\
 This script will run some configurations of governor.opy and check the SSIM score of the output images.
 """
 
 
+# Arguments shared by every governor invocation; the builders below only add
+# the resolution, upscaler and comparison specifics
+_COMMON_ARGS = (
+    "--present-res",
+    "2560",
+    "1440",
+    "--benchmark",
+    "1",
+    "--scene",
+    "Sponza",
+    "--dlssMode",
+    "Quality",
+    "--reduced-motion",
+    "--use-default",
+    "--structured-logs",
+    "--compare",
+    "ssim",
+)
+
+
+@functools.lru_cache(maxsize=None)
 def get_cross_command(upscaler):
-    render_res = ["1280", "720"] if upscaler != "Native" else ["2560", "1440"]
-    fps = 30 if upscaler in ["FSR3", "DLSS"] else 60
+    render_res = ("1280", "720") if upscaler != "Native" else ("2560", "1440")
+    fps = 30 if upscaler in ("FSR3", "DLSS") else 60
     return [
         "python",
         "governor.py",
         "--render-res",
         *render_res,
-        "--present-res",
-        "2560",
-        "1440",
-        "--benchmark",
-        "1",
+        *_COMMON_ARGS,
         "--upscaler",
         upscaler,
         "--fps",
         str(fps),
-        "--scene",
-        "Sponza",
-        "--dlssMode",
-        "Quality",
-        "--reduced-motion",
-        "--use-default",
-        "--structured-logs",
-        "--compare",
-        "ssim",
         "--compare-with",
         upscaler,
         "--switch-default-mode",
@@ -42,32 +56,20 @@ def get_cross_command(upscaler):
     ]
 
 
+@functools.lru_cache(maxsize=None)
 def get_native_command(upscaler):
-    render_res = ["2560", "1440"]
-    fps = 30 if upscaler in ["FSR3", "DLSS"] else 60
+    fps = 30 if upscaler in ("FSR3", "DLSS") else 60
     return [
         "python",
         "governor.py",
         "--render-res",
-        *render_res,
-        "--present-res",
         "2560",
         "1440",
-        "--benchmark",
-        "1",
+        *_COMMON_ARGS,
         "--upscaler",
         upscaler,
         "--fps",
         str(fps),
-        "--scene",
-        "Sponza",
-        "--dlssMode",
-        "Quality",
-        "--reduced-motion",
-        "--use-default",
-        "--structured-logs",
-        "--compare",
-        "ssim",
         "--compare-with",
         "Native",
         "--compare-fps",
@@ -75,25 +77,113 @@ def get_native_command(upscaler):
     ]
 
 
+def get_cross_overrides(upscaler):
+    fps = 30 if upscaler in ("FSR3", "DLSS") else 60
+    return {
+        "render_res": [1280, 720] if upscaler != "Native" else [2560, 1440],
+        "upscaler": upscaler,
+        "fps": fps,
+        "compare_with": upscaler,
+        "switch_default_mode": True,
+        "compare_fps": fps,
+    }
+
+
+def get_native_overrides(upscaler):
+    fps = 30 if upscaler in ("FSR3", "DLSS") else 60
+    return {
+        "render_res": [2560, 1440],
+        "upscaler": upscaler,
+        "fps": fps,
+        "compare_with": "Native",
+        "compare_fps": 60,
+    }
+
+
+def run_suite_batched(points, timeout=30):
+    """Run every point through a single governor --sweep process.
+
+    One interpreter serves the whole suite, so Python startup, the imports
+    and the config loads are paid once instead of per run. Returns one SSIM
+    per point, in order; points whose metric never appeared yield None.
+    """
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", delete=False
+    ) as sweep_file:
+        json.dump(points, sweep_file)
+
+    command = ["python", "governor.py", *_COMMON_ARGS, "--sweep", sweep_file.name]
+    print(" ".join(command))
+
+    scores = []
+    proc = None
+    try:
+        proc = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        watchdog = threading.Timer(timeout * len(points), proc.kill)
+        watchdog.start()
+        try:
+            for line in proc.stdout:
+                if "METRIC_SSIM" in line:
+                    scores.append(float(line.split()[-1]))
+        finally:
+            watchdog.cancel()
+        proc.wait(timeout=5)
+    except Exception as e:
+        # proc is None when Popen itself failed; there is nothing to kill
+        print(f"An error occurred: {e}")
+        if proc is not None:
+            proc.kill()
+    finally:
+        os.remove(sweep_file.name)
+
+    # Pad so a crashed sweep still lines up with its upscalers
+    scores += [None] * (len(points) - len(scores))
+    return scores
+
+
 def run_and_get_ssim(command, timeout=30, tries=3):
     while tries > 0:
-        try:
-            proc = subprocess.Popen(
-                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-            )
+        proc = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
 
-            # Wait for process to complete or timeout
-            output, _ = proc.communicate(timeout=timeout)
+        # Kill the run if it blows the deadline; the readline below would
+        # otherwise block forever on a hung child
+        timed_out = threading.Event()
 
-            # Check each line for the SSIM metric
-            for line in output.splitlines():
-                if "METRIC_SSIM" in line:
-                    return float(line.split()[-1])
-        except subprocess.TimeoutExpired:
+        def kill_on_timeout():
+            timed_out.set()
             proc.kill()
-            print(f"Timeout reached. Killing process. {tries-1} tries left.")
+
+        watchdog = threading.Timer(timeout, kill_on_timeout)
+        watchdog.start()
+
+        # Stream the output and stop at the metric instead of buffering the
+        # whole run; the score is available long before the child winds down
+        ssim = None
+        try:
+            for line in proc.stdout:
+                if "METRIC_SSIM" in line:
+                    ssim = float(line.split()[-1])
+                    break
         except Exception as e:
             print(f"An error occurred: {e}")
+        finally:
+            watchdog.cancel()
+
+        if ssim is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            return ssim
+
+        proc.kill()
+        if timed_out.is_set():
+            print(f"Timeout reached. Killing process. {tries-1} tries left.")
 
         tries -= 1
         print(f"Failed to get SSIM score. Retrying... {tries} tries left")
@@ -101,30 +191,58 @@ def run_and_get_ssim(command, timeout=30, tries=3):
     return None  # Return None if SSIM score could not be obtained
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Validate upscaler SSIM scores")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        default=False,
+        help="Run each suite through a single governor --sweep process instead of one process per run",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Governor runs to dispatch at once; governor serializes the shared config-write/spawn window across processes, so values above 1 mainly pay off with more than one GPU",
+    )
+    return parser.parse_args()
+
+
+def run_suite(commands, jobs):
+    if jobs > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(run_and_get_ssim, commands))
+    results = []
+    for command in commands:
+        print(" ".join(command))
+        results.append(run_and_get_ssim(command))
+    return results
+
+
 if __name__ == "__main__":
+    args = parse_args()
+
     # Remove results
     for file in glob.glob("bin/benchmark/*"):
         os.remove(file)
 
-    cross = []
-    native = []
-
     upscalers = ["Native", "FSR3", "DLSS", "FSR3Upscale", "DLSSUpscale"]
-    for upscaler in upscalers:
-        command = get_cross_command(upscaler)
-        print(" ".join(command))
-        ssim = run_and_get_ssim(command)
+
+    if args.batch:
+        cross = run_suite_batched([get_cross_overrides(u) for u in upscalers])
+    else:
+        cross = run_suite([get_cross_command(u) for u in upscalers], args.jobs)
+    for upscaler, ssim in zip(upscalers, cross):
         print(f"Cross-validation SSIM for {upscaler}: {ssim}")
-        cross.append(ssim)
-        print()
+    print()
 
-    for upscaler in upscalers:
-        command = get_native_command(upscaler)
-        print(" ".join(command))
-        ssim = run_and_get_ssim(command)
+    if args.batch:
+        native = run_suite_batched([get_native_overrides(u) for u in upscalers])
+    else:
+        native = run_suite([get_native_command(u) for u in upscalers], args.jobs)
+    for upscaler, ssim in zip(upscalers, native):
         print(f"Native-validation SSIM for {upscaler}: {ssim}")
-        native.append(ssim)
-        print()
+    print()
 
     # Visualize the results as a table
     print("\n\n")